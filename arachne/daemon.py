@@ -60,7 +60,8 @@ class ArachneDaemon(Daemon):
         self._sites_info = {}
         for site in sites:
             site['url'] = URL(site['url'], True)
-            self._sites_info[hashlib.sha1(str(site['url'])).hexdigest()] = site
+            site_id = intern(hashlib.sha1(str(site['url'])).hexdigest())
+            self._sites_info[site_id] = site
         # Create or check required directories.
         self._results_dir = os.path.join(spool_dir, 'results')
         if not os.path.isdir(self._results_dir):
@@ -119,6 +119,25 @@ class FTPHandler(ProtocolHandler):
 
     name = 'ftp'
 
+    # Regular expression used to parse the lines of a LIST response.  Based on
+    # ftpparse.c and ftpparse.h by D. J. Bernstein.  Each alternative is
+    # wrapped in a named group, so the `lastgroup` attribute of the match
+    # object tells the format of the line.  The target of symbolic links is
+    # left out of the `unix_name` group.
+    _LIST_RE = re.compile(r"""
+        (?P<unix>               # UNIX-style listing.
+            (?P<unix_type>(?P<unix_link>l)|[-dbcps])\S*(?:\s+\S+){7}\s+
+            (?P<unix_name>\S.*?)(?(unix_link)(?:\ ->\ .*)?)$
+        )|(?P<msdos>            # MSDOS format.
+            [0-9].{16}\s*(?:<DIR>.{0,10}(?P<msdos_dir>.*)
+                             |\S[^\ ]*\ (?P<msdos_file>.*))
+        )|(?P<eplf>             # Easily Parsed LIST Format.
+            \+(?P<eplf_facts>[^\t]*)\t(?P<eplf_name>[^\t]*)$
+        )""", re.VERBOSE)
+
+    # Values of the is_dir flag for each file type in UNIX-style listings.
+    _UNIX_IS_DIR = {'-': False, 'd': True}
+
     def __init__(self, sites_info, tasks, results):
         """Initialize the handler.
         """
@@ -204,8 +223,8 @@ class FTPHandler(ProtocolHandler):
             self._results.put(result)
             self._tasks.report_done(task)
 
-    @staticmethod
-    def _parse_list(line):
+    @classmethod
+    def _parse_list(cls, line):
         """Parse lines from a LIST response.
 
         `None` is returned if could not parse the line, otherwise it returns a
@@ -213,57 +232,24 @@ class FTPHandler(ProtocolHandler):
         it is a directory.  The Boolean value will be `None` if the parse could
         not known if the item is a directory or not.
         """
-        # Based on ftpparse.c and ftpparse.h by D. J. Bernstein.
-        if line.startswith(tuple('-dbclps')):
-            # UNIX-style listing.
-            try:
-                if line[0] == '-':
-                    is_dir = False
-                elif line[0] == 'd':
-                    is_dir = True
-                else:
-                    is_dir = None
-                data = line.split(None, 8)
-                if len(data) == 9:
-                    if line[0] == 'l':
-                        name = data[-1].split(' -> ')[0]
-                    else:
-                        name = data[-1]
-                else:
-                    raise ValueError('Invalid line format.')
-            except ValueError:
-                return None
-            else:
-                return (name, is_dir)
-        elif line.startswith(tuple('0123456789')):
-            # MSDOS format.
-            try:
-                line  = line[17:].lstrip()
-                if line.startswith('<DIR>'):
-                    is_dir = True
-                    name = line[15:]
-                else:
-                    is_dir = False
-                    name = line[line.index(' ') + 1:]
-            except (IndexError, ValueError):
-                return None
-            else:
-                return (name, is_dir)
-        elif line.startswith('+'):
-            # Easily Parsed LIST Format.
-            try:
-                facts, name = line[1:].split('\t')
-                facts = facts.split(',')
-                is_dir = '/' in facts
-            except IndexError:
-                return None
-            else:
-                return (name, is_dir)
-        else:
+        match = cls._LIST_RE.match(line)
+        if match is None:
             # Could not parse the line.  Maybe because the format is unknown
             # format or it contains additional information provided by the FTP
             # server that can be ignored.
             return None
+        list_format = match.lastgroup
+        if list_format == 'unix':
+            return (match.group('unix_name'),
+                    cls._UNIX_IS_DIR.get(match.group('unix_type')))
+        elif list_format == 'msdos':
+            if match.group('msdos_dir') is not None:
+                return (match.group('msdos_dir'), True)
+            else:
+                return (match.group('msdos_file'), False)
+        else:
+            facts = match.group('eplf_facts').split(',')
+            return (match.group('eplf_name'), '/' in facts)
 
     @staticmethod
     def _get_content(url):
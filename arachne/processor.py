@@ -80,10 +80,10 @@ class NaiveProcessor(ResultProcessor):
     def process(self, result):
         """Process a crawl result.
         """
-        for entry_url, data in result:
-            if data['is_dir']:
-                task = CrawlTask(result.task.site_id, entry_url)
-                self._tasks.put_new(task)
+        site_id = result.task.site_id
+        self._tasks.put_new_many(CrawlTask(site_id, entry_url)
+                                 for entry_url, data in result
+                                 if data['is_dir'])
         self._results.report_done(result)
 
 
@@ -162,6 +162,8 @@ class IndexProcessor(ResultProcessor):
         for lang in self.STEM_LANGS:
             stemmer = xapian.Stem(lang)
             self._stemmers.append(stemmer)
+        # Terms of the last dirname seen by _get_dirname_terms().
+        self._dirname_terms = (None, (), ())
         # Remove documents of old sites from the index.
         old_site_ids = [term.term[len(self.SITE_ID_PREFIX):]
                         for term in self._db.allterms(self.SITE_ID_PREFIX)]
@@ -236,6 +238,7 @@ class IndexProcessor(ResultProcessor):
                             # index and then add it again with the right data.
                             self._db.delete_document(doc.get_docid())
             # Add new or modified entries.
+            new_tasks = []
             for entry, data in result:
                 if entry not in indexed_entries:
                     # New entry found in the directory. Mark as changed, index
@@ -245,8 +248,9 @@ class IndexProcessor(ResultProcessor):
                     doc = self._create_document(site_id, data)
                     self._db.add_document(doc)
                     if data['is_dir']:
-                        task = CrawlTask(result.task.site_id, data['url'])
-                        self._tasks.put_new(task)
+                        new_tasks.append(CrawlTask(site_id, data['url']))
+            # The tasks for the new directories are put in the queue at once.
+            self._tasks.put_new_many(new_tasks)
             # Put a new task to visit the directory again.
             self._tasks.put_visited(result.task, dir_changed)
         # Result sucessfully processed.
@@ -308,25 +312,48 @@ class IndexProcessor(ResultProcessor):
         absolute or relative.
         """
         terms = set()
+        add_term = terms.add
+        min_length = cls._MIN_TERM_LENGTH
+        valid_short_terms = cls._VALID_SHORT_TERMS
+        term_translation = cls._TERM_TRANSLATION
+        camel_case_sub = cls._CAMEL_CASE_RE.sub
         path = path.translate(cls._WHITE_SPACE_TRANSLATION)
         path = cls._WHITE_SPACE_RE.sub(u' ', path)
         for term in cls._SPLIT_RE.split(path):
             term = term.strip()
-            if (len(term) >= cls._MIN_TERM_LENGTH
-                or term in cls._VALID_SHORT_TERMS):
-                terms.add(term.lower())
+            if len(term) >= min_length or term in valid_short_terms:
+                add_term(term.lower())
                 # Add translated terms.
-                translated = term.translate(cls._TERM_TRANSLATION)
-                terms.add(translated.lower())
-                # Add camel cased words.
-                words = cls._CAMEL_CASE_RE.sub(u' ', translated).split(u' ')
+                translated = term.translate(term_translation)
+                add_term(translated.lower())
+                # Add camel cased words. A lowercase term has no camel case
+                # boundaries and its only word was already added above.
+                if translated.islower():
+                    continue
+                words = camel_case_sub(u' ', translated).split(u' ')
                 for word in words:
                     word = word.strip()
-                    if (len(word) >= cls._MIN_TERM_LENGTH
-                        or word in cls._VALID_SHORT_TERMS):
-                        terms.add(word.lower())
+                    if len(word) >= min_length or word in valid_short_terms:
+                        add_term(word.lower())
         return terms
 
+    def _get_dirname_terms(self, dirname):
+        """Return the terms and the stemmed terms for the given dirname.
+
+        All the entries of a crawl result have the same dirname, so the terms
+        of the last dirname are cached to avoid extracting and stemming them
+        again for each entry.
+        """
+        if self._dirname_terms[0] != dirname:
+            terms = self.get_terms(dirname)
+            stemmed_terms = set()
+            for term in terms:
+                for stemmer in self._stemmers:
+                    stemmed_term = stemmer(term).decode('utf-8')
+                    stemmed_terms.add(stemmed_term)
+            self._dirname_terms = (dirname, terms, stemmed_terms)
+        return self._dirname_terms[1:]
+
     def _create_document(self, site_id, data):
         """Create and return a Xapian document from `data`.
         """
@@ -359,11 +386,11 @@ class IndexProcessor(ResultProcessor):
                 generator.set_stemmer(stemmer)
             generator.set_document(doc)
             generator.index_text_without_positions(data['content'], 1, self.CONTENT_PREFIX)
-        for term in self.get_terms(url.dirname):
+        dirname_terms, dirname_stemmed_terms = \
+            self._get_dirname_terms(url.dirname)
+        for term in dirname_terms:
             doc.add_term(self.DIRNAME_PREFIX + term)
-            for stemmer in self._stemmers:
-                stemmed_term = stemmer(term).decode('utf-8')
-                stemmed_terms.add(stemmed_term)
+        stemmed_terms.update(dirname_stemmed_terms)
         doc.add_value(self.DIRNAME_SLOT, url.dirname.rstrip(u'/') + u'/')
         for stemmed_term in stemmed_terms:
             doc.add_term(self.STEM_PREFIX + stemmed_term)
@@ -36,6 +36,8 @@ class CrawlResult(object):
     executing a `CrawlTask`.
     """
 
+    __slots__ = ('_task', '_found', '_entries')
+
     def __init__(self, task, found):
         """Initialize a crawl result without entries.
         """
@@ -66,18 +68,15 @@ class CrawlResult(object):
     def __getstate__(self):
         """Used by pickle when instances are serialized.
         """
-        return {
-            'task': self._task,
-            'found': self._found,
-            'entries': self._entries,
-        }
+        return (self._task, self._found, self._entries)
 
     def __setstate__(self, state):
         """Used by pickle when instances are unserialized.
         """
-        self._task = state['task']
-        self._found = state['found']
-        self._entries = state['entries']
+        if isinstance(state, dict):
+            # Result pickled by a previous version, still in a queue.
+            state = (state['task'], state['found'], state['entries'])
+        self._task, self._found, self._entries = state
 
     def add_entry(self, entry, data):
         """Add a new entry.
@@ -106,14 +105,20 @@ class ResultQueue(object):
     This queue is used to collect the crawl results waiting to be processed.
     """
 
-    def __init__(self, sites_info, db_home):
+    def __init__(self, sites_info, db_home, sync=False):
         """Initialize the queue.
+
+        Transactions are not flushed to disk on commit unless `sync` is
+        true.  The queue stays consistent after a crash but the last
+        committed changes may be lost.
         """
         # Initialize the Berkeley DB environment.  This environment will
         # contain Btree databases with duplicated records (unsorted).  Records
         # in all databases use the same key, so, they will be organized by the
         # order of insertion.
         self._db_env = bsddb.db.DBEnv()
+        if not sync:
+            self._db_env.set_flags(bsddb.db.DB_TXN_WRITE_NOSYNC, 1)
         self._db_env.open(db_home, bsddb.db.DB_CREATE | bsddb.db.DB_RECOVER
                           | bsddb.db.DB_INIT_TXN | bsddb.db.DB_INIT_LOG
                           | bsddb.db.DB_INIT_MPOOL | bsddb.db.DB_THREAD)
@@ -168,18 +173,23 @@ class ResultQueue(object):
         """
         self._mutex.acquire()
         try:
-            site_id = result.task.site_id
-            result_db = self._result_dbs[site_id]
-            # Assign the right key to the result.
-            if not result.found:
-                key = self._notfound_key
-            elif result.task.revisit_count == -1:
-                key = self._new_key
-            else:
-                key = self._normal_key
             txn = self._db_env.txn_begin()
-            self._sites_db.put(key, site_id, txn)
-            result_db.put(key, cPickle.dumps(result, 2), txn)
+            self._put(result, txn)
+            txn.commit()
+        finally:
+            self._mutex.release()
+
+    def put_many(self, results):
+        """Enqueue several crawl results.
+
+        It is equivalent to calling `put()` for each result in the `results`
+        iterable, but all the results are written in a single transaction.
+        """
+        self._mutex.acquire()
+        try:
+            txn = self._db_env.txn_begin()
+            for result in results:
+                self._put(result, txn)
             txn.commit()
         finally:
             self._mutex.release()
@@ -233,6 +243,56 @@ class ResultQueue(object):
         finally:
             self._mutex.release()
 
+    def get_many(self, n):
+        """Return the `n` crawl results at the head of the queue.
+
+        The results are returned in the order `get()` would return them and,
+        as in `get()`, they are not removed from the queue until they are
+        reported as processed (see `report_done_many()`).  If there are less
+        than `n` results available all of them are returned.
+        """
+        self._mutex.acquire()
+        try:
+            results = []
+            if n <= 0 or not self._sites_db:
+                return results
+            txn = self._db_env.txn_begin()
+            sites_cursor = self._sites_db.cursor(txn)
+            # Cursors in the databases of the sites already visited.  The
+            # records of a site in the sites database match the results in its
+            # database in the same order.
+            result_cursors = {}
+            sites_record = sites_cursor.first()
+            while sites_record is not None and len(results) < n:
+                site_id = sites_record[1]
+                try:
+                    result_db = self._result_dbs[site_id]
+                except KeyError:
+                    # An old site.
+                    sites_cursor.delete()
+                else:
+                    result_cursor = result_cursors.get(site_id)
+                    if result_cursor is None:
+                        result_cursor = result_db.cursor(txn)
+                        result_cursors[site_id] = result_cursor
+                        result_record = result_cursor.first()
+                    else:
+                        result_record = result_cursor.next()
+                    if result_record is None:
+                        # The database can be empty if a site is removed from
+                        # the configuration file and added again.
+                        sites_cursor.delete()
+                    else:
+                        results.append(cPickle.loads(result_record[1]))
+                sites_record = sites_cursor.next()
+            for result_cursor in result_cursors.itervalues():
+                result_cursor.close()
+            sites_cursor.close()
+            txn.commit()
+            return results
+        finally:
+            self._mutex.release()
+
     def report_done(self, result):
         """Report a result as processed.
 
@@ -240,17 +300,24 @@ class ResultQueue(object):
         """
         self._mutex.acquire()
         try:
-            site_id = result.task.site_id
-            result_db = self._result_dbs[site_id]
             txn = self._db_env.txn_begin()
-            sites_cursor = self._sites_db.cursor(txn)
-            sites_cursor.first()
-            sites_cursor.delete()
-            sites_cursor.close()
-            result_cursor = result_db.cursor(txn)
-            result_cursor.first()
-            result_cursor.delete()
-            result_cursor.close()
+            self._remove_head(result, txn)
+            txn.commit()
+        finally:
+            self._mutex.release()
+
+    def report_done_many(self, results):
+        """Report several results as processed.
+
+        It is equivalent to calling `report_done()` for each result in the
+        `results` iterable (usually returned by `get_many()`), but all the
+        results are removed in a single transaction.
+        """
+        self._mutex.acquire()
+        try:
+            txn = self._db_env.txn_begin()
+            for result in results:
+                self._remove_head(result, txn)
             txn.commit()
         finally:
             self._mutex.release()
@@ -266,20 +333,44 @@ class ResultQueue(object):
             site_id = result.task.site_id
             result_db = self._result_dbs[site_id]
             txn = self._db_env.txn_begin()
-            sites_cursor = self._sites_db.cursor(txn)
-            sites_cursor.first()
-            sites_cursor.delete()
-            sites_cursor.close()
-            result_cursor = result_db.cursor(txn)
-            result_cursor.first()
-            result_cursor.delete()
-            result_cursor.close()
+            self._remove_head(result, txn)
             self._sites_db.put(self._error_key, site_id, txn)
             result_db.put(self._error_key, cPickle.dumps(result, 2), txn)
             txn.commit()
         finally:
             self._mutex.release()
 
+    def drain(self, batch_size=100):
+        """Iterate over the crawl results in the queue removing them.
+
+        The results are read with `get_many()` in batches of `batch_size` and
+        each batch is reported as processed once all its results have been
+        consumed.  The results of an unfinished batch remain in the queue, so
+        a caller that stops iterating does not lose them.  Unlike
+        `TaskQueue.remove_many()`, nothing is removed until the iteration
+        resumes after a batch.
+        """
+        while True:
+            results = self.get_many(batch_size)
+            if not results:
+                break
+            for result in results:
+                yield result
+            self.report_done_many(results)
+
+    def clear(self):
+        """Remove all the crawl results from the queue.
+        """
+        self._mutex.acquire()
+        try:
+            txn = self._db_env.txn_begin()
+            self._sites_db.truncate(txn)
+            for result_db in self._result_dbs.itervalues():
+                result_db.truncate(txn)
+            txn.commit()
+        finally:
+            self._mutex.release()
+
     def flush(self):
         """Flush to disc the modifications.
         """
@@ -299,6 +390,43 @@ class ResultQueue(object):
             self._sites_db.close()
             for result_db in self._result_dbs.itervalues():
                 result_db.close()
+            # Write the pending changes to the databases before closing the
+            # environment, the next recovery will have less work to do.
+            self._db_env.txn_checkpoint()
             self._db_env.close()
         finally:
             self._mutex.release()
+
+    def _remove_head(self, result, txn):
+        """Remove the crawl result at the head of the queue.
+
+        Internal method used by `report_done()`, `report_done_many()` and
+        `report_error()`.  The result is removed using the given transaction.
+        """
+        result_db = self._result_dbs[result.task.site_id]
+        sites_cursor = self._sites_db.cursor(txn)
+        sites_cursor.first()
+        sites_cursor.delete()
+        sites_cursor.close()
+        result_cursor = result_db.cursor(txn)
+        result_cursor.first()
+        result_cursor.delete()
+        result_cursor.close()
+
+    def _put(self, result, txn):
+        """Put a crawl result in the queue.
+
+        Internal method used by `put()` and `put_many()`.  The result is
+        written using the given transaction.
+        """
+        site_id = result.task.site_id
+        result_db = self._result_dbs[site_id]
+        # Assign the right key to the result.
+        if not result.found:
+            key = self._notfound_key
+        elif result.task.revisit_count == -1:
+            key = self._new_key
+        else:
+            key = self._normal_key
+        self._sites_db.put(key, site_id, txn)
+        result_db.put(key, cPickle.dumps(result, 2), txn)
@@ -33,6 +33,11 @@ import threading
 from arachne.error import EmptyQueue
 from arachne.util.time import secs_to_readable
 
+# Function returning the current time in seconds since the epoch, used by the
+# task queue to schedule the tasks.  It can be replaced to run the queue with a
+# different clock (the tests use it to avoid waiting).
+_now = time.time
+
 
 class CrawlTask(object):
     """Crawl task.
@@ -41,10 +46,15 @@ class CrawlTask(object):
     Executing a task produces a `CrawlTask`.
     """
 
+    __slots__ = ('_site_id', '_url', '_revisit_wait', '_revisit_count',
+                 '_change_count')
+
     def __init__(self, site_id, url):
         """Initialize a crawl task.
         """
-        self._site_id = site_id
+        # Site IDs are used as keys of dictionaries in the queues.  Interned
+        # strings are compared by identity in the lookups.
+        self._site_id = intern(site_id)
         self._url = url
         self._revisit_wait = 0
         self._revisit_count = -1
@@ -53,22 +63,19 @@ class CrawlTask(object):
     def __getstate__(self):
         """Used by pickle when instances are serialized.
         """
-        return {
-            'site_id': self._site_id,
-            'url': self._url,
-            'revisit_wait': self._revisit_wait,
-            'revisit_count': self._revisit_count,
-            'change_count': self._change_count,
-        }
+        return (self._site_id, self._url, self._revisit_wait,
+                self._revisit_count, self._change_count)
 
     def __setstate__(self, state):
         """Use by pickle when instances are serialized.
         """
-        self._site_id = state['site_id']
-        self._url = state['url']
-        self._revisit_wait = state['revisit_wait']
-        self._revisit_count = state['revisit_count']
-        self._change_count = state['change_count']
+        if isinstance(state, dict):
+            # Task pickled by a previous version, still in a queue.
+            state = (state['site_id'], state['url'], state['revisit_wait'],
+                     state['revisit_count'], state['change_count'])
+        site_id, self._url, self._revisit_wait, self._revisit_count, \
+            self._change_count = state
+        self._site_id = intern(site_id)
 
     def report_visit(self, changed):
         """Report that the directory was visited.
@@ -136,25 +143,27 @@ class TaskQueue(object):
     Queue used to collect the crawl tasks that are going to be executed.
     """
 
-    def __init__(self, sites_info, db_home):
+    def __init__(self, sites_info, db_home, sync=False):
         """Initializes the queue.
+
+        Transactions are not flushed to disk on commit unless `sync` is
+        true.  The queue stays consistent after a crash but the last
+        committed changes may be lost.
         """
         # Initialize the Berkeley DB environment.  This environment will
         # contain Btree databases with duplicated records (unsorted).  Records
         # in all databases uses an integer (as string) indicating when the
         # tasks should be executed.
         self._db_env = bsddb.db.DBEnv()
+        if not sync:
+            self._db_env.set_flags(bsddb.db.DB_TXN_WRITE_NOSYNC, 1)
         self._db_env.open(db_home, bsddb.db.DB_CREATE | bsddb.db.DB_RECOVER
                           | bsddb.db.DB_INIT_TXN | bsddb.db.DB_INIT_LOG
                           | bsddb.db.DB_INIT_MPOOL | bsddb.db.DB_THREAD)
         self._key_length = len(str(sys.maxint))
         # Create the database for the sites.
         sites_db_name = 'sites.db'
-        self._sites_db = bsddb.db.DB(self._db_env)
-        self._sites_db.set_flags(bsddb.db.DB_DUP)
-        self._sites_db.open(sites_db_name, bsddb.db.DB_BTREE,
-                            bsddb.db.DB_CREATE | bsddb.db.DB_AUTO_COMMIT
-                            | bsddb.db.DB_THREAD)
+        self._sites_db = self._open_db(sites_db_name)
         # Get the list of databases to purge sites that were removed from the
         # configuration file.
         old_dbs = [os.path.basename(db_path)
@@ -164,11 +173,7 @@ class TaskQueue(object):
         self._task_dbs = {}
         for site_id, info in sites_info.iteritems():
             task_db_name = '%s.db' % site_id
-            task_db = bsddb.db.DB(self._db_env)
-            task_db.set_flags(bsddb.db.DB_DUP)
-            task_db.open(task_db_name, bsddb.db.DB_BTREE, bsddb.db.DB_CREATE
-                         | bsddb.db.DB_AUTO_COMMIT | bsddb.db.DB_THREAD)
-            self._task_dbs[site_id] = task_db
+            self._task_dbs[site_id] = self._open_db(task_db_name)
             if task_db_name in old_dbs:
                 old_dbs.remove(task_db_name)
                 if site_id not in self._sites_db.values():
@@ -209,6 +214,25 @@ class TaskQueue(object):
         finally:
             self._mutex.release()
 
+    def put_new_many(self, tasks):
+        """Put tasks for several new directories.
+
+        It is equivalent to calling `put_new()` for each task in the `tasks`
+        iterable, but all the tasks are written in a single transaction.
+        """
+        self._mutex.acquire()
+        try:
+            txn = self._db_env.txn_begin()
+            for task in tasks:
+                site_info = self._sites_info[task.site_id]
+                max_depth = site_info['max_depth']
+                current_depth = task.url.path.count(u'/')
+                if current_depth <= max_depth:
+                    self._put(task, 0, txn)
+            txn.commit()
+        finally:
+            self._mutex.release()
+
     def put_visited(self, task, changed):
         """Put a task for a visited directory.
 
@@ -255,58 +279,7 @@ class TaskQueue(object):
         """
         self._mutex.acquire()
         try:
-            if not self._sites_db:
-                # Sites database is empty.
-                raise EmptyQueue('No sites.')
-            task = None
-            txn = self._db_env.txn_begin()
-            sites_cursor = self._sites_db.cursor(txn)
-            site_priority, site_id = sites_cursor.first()
-            while task is None:
-                site_priority, site_id = sites_cursor.current()
-                if site_priority > self._get_key():
-                    # The site cannot be visited right now.
-                    sites_cursor.close()
-                    txn.commit()
-                    raise EmptyQueue('No available sites.')
-                try:
-                    task_db = self._task_dbs[site_id]
-                except KeyError:
-                    # Got the ID of an old site.
-                    sites_cursor.delete()
-                    if not sites_cursor.next():
-                        # Last site in database checked.
-                        sites_cursor.close()
-                        txn.commit()
-                        raise EmptyQueue('No executable tasks.')
-                else:
-                    if not task_db:
-                        # The task database is empty.
-                        if not sites_cursor.next():
-                            # Last site in database checked.
-                            sites_cursor.close()
-                            txn.commit()
-                            raise EmptyQueue('No executable tasks.')
-                    else:
-                        task_cursor = task_db.cursor(txn)
-                        task_priority, pickled_task = task_cursor.first()
-                        if task_priority > self._get_key():
-                            # The task at the head of the database is not
-                            # executable right now.
-                            if not sites_cursor.next():
-                                # Last site in database checked.
-                                task_cursor.close()
-                                sites_cursor.close()
-                                txn.commit()
-                                raise EmptyQueue('No executable tasks.')
-                        else:
-                            # There is an executable task.
-                            sites_cursor.delete()
-                            task = cPickle.loads(pickled_task)
-                        task_cursor.close()
-            sites_cursor.close()
-            txn.commit()
-            return task
+            return self._get()
         finally:
             self._mutex.release()
 
@@ -317,17 +290,29 @@ class TaskQueue(object):
         """
         self._mutex.acquire()
         try:
-            site_id = task.site_id
-            site_info = self._sites_info[site_id]
-            txn = self._db_env.txn_begin()
-            site_key = self._get_key(site_info['request_wait'])
-            self._sites_db.put(site_key, site_id, txn)
-            task_db = self._task_dbs[site_id]
-            task_cursor = task_db.cursor(txn)
-            task_cursor.first()
-            task_cursor.delete()
-            task_cursor.close()
-            txn.commit()
+            self._report_done(task)
+        finally:
+            self._mutex.release()
+
+    def remove_many(self, n):
+        """Get up to `n` executable tasks and report them as done.
+
+        It is equivalent to calling `get()` and `report_done()` for each task
+        until `n` tasks are removed or there are no executable tasks.  The
+        tasks are removed before returning the list of removed tasks, unlike
+        `ResultQueue.drain()` which yields the results lazily.
+        """
+        self._mutex.acquire()
+        try:
+            tasks = []
+            while len(tasks) < n:
+                try:
+                    task = self._get()
+                except EmptyQueue:
+                    break
+                self._report_done(task)
+                tasks.append(task)
+            return tasks
         finally:
             self._mutex.release()
 
@@ -383,6 +368,22 @@ class TaskQueue(object):
         finally:
             self._mutex.release()
 
+    def reopen(self):
+        """Close the databases and open them again.
+
+        The databases are written to disk and opened using new handles, but
+        the Berkeley DB environment is not closed.
+        """
+        self._mutex.acquire()
+        try:
+            self._sites_db.close()
+            self._sites_db = self._open_db('sites.db')
+            for site_id, task_db in self._task_dbs.items():
+                task_db.close()
+                self._task_dbs[site_id] = self._open_db('%s.db' % site_id)
+        finally:
+            self._mutex.release()
+
     def close(self):
         """Close the queue.
         """
@@ -391,17 +392,106 @@ class TaskQueue(object):
             self._sites_db.close()
             for task_db in self._task_dbs.itervalues():
                 task_db.close()
+            # Write the pending changes to the databases before closing the
+            # environment, the next recovery will have less work to do.
+            self._db_env.txn_checkpoint()
             self._db_env.close()
         finally:
             self._mutex.release()
 
+    def _get(self):
+        """Return an executable task.
+
+        Internal method used by `get()` and `remove_many()`, the mutex should
+        be acquired by the caller.
+        """
+        if not self._sites_db:
+            # Sites database is empty.
+            raise EmptyQueue('No sites.')
+        task = None
+        txn = self._db_env.txn_begin()
+        sites_cursor = self._sites_db.cursor(txn)
+        site_priority, site_id = sites_cursor.first()
+        while task is None:
+            site_priority, site_id = sites_cursor.current()
+            if site_priority > self._get_key():
+                # The site cannot be visited right now.
+                sites_cursor.close()
+                txn.commit()
+                raise EmptyQueue('No available sites.')
+            try:
+                task_db = self._task_dbs[site_id]
+            except KeyError:
+                # Got the ID of an old site.
+                sites_cursor.delete()
+                if not sites_cursor.next():
+                    # Last site in database checked.
+                    sites_cursor.close()
+                    txn.commit()
+                    raise EmptyQueue('No executable tasks.')
+            else:
+                if not task_db:
+                    # The task database is empty.
+                    if not sites_cursor.next():
+                        # Last site in database checked.
+                        sites_cursor.close()
+                        txn.commit()
+                        raise EmptyQueue('No executable tasks.')
+                else:
+                    task_cursor = task_db.cursor(txn)
+                    task_priority, pickled_task = task_cursor.first()
+                    if task_priority > self._get_key():
+                        # The task at the head of the database is not
+                        # executable right now.
+                        if not sites_cursor.next():
+                            # Last site in database checked.
+                            task_cursor.close()
+                            sites_cursor.close()
+                            txn.commit()
+                            raise EmptyQueue('No executable tasks.')
+                    else:
+                        # There is an executable task.
+                        sites_cursor.delete()
+                        task = cPickle.loads(pickled_task)
+                    task_cursor.close()
+        sites_cursor.close()
+        txn.commit()
+        return task
+
+    def _report_done(self, task):
+        """Report task as done.
+
+        Internal method used by `report_done()` and `remove_many()`, the mutex
+        should be acquired by the caller.
+        """
+        site_id = task.site_id
+        site_info = self._sites_info[site_id]
+        txn = self._db_env.txn_begin()
+        site_key = self._get_key(site_info['request_wait'])
+        self._sites_db.put(site_key, site_id, txn)
+        task_db = self._task_dbs[site_id]
+        task_cursor = task_db.cursor(txn)
+        task_cursor.first()
+        task_cursor.delete()
+        task_cursor.close()
+        txn.commit()
+
+    def _open_db(self, db_name):
+        """Open or create a database in the environment of the queue.
+        """
+        db = bsddb.db.DB(self._db_env)
+        db.set_flags(bsddb.db.DB_DUP)
+        db.open(db_name, bsddb.db.DB_BTREE, bsddb.db.DB_CREATE
+                | bsddb.db.DB_AUTO_COMMIT | bsddb.db.DB_THREAD)
+        return db
+
     def _put(self, task, seconds=0, txn=None):
         """Put a task in the queue.
 
         Internal method used to put a task in the queue that should be executed
         after the given number of seconds.  It is invoked by `put_new()`,
-        `put_visited()` and `put_revisited()`.  The default value for the
-        `seconds` argument is 0, meaning right now.
+        `put_new_many()`, `put_visited()` and `report_error_dir()`.  The
+        default value for the `seconds` argument is 0, meaning right now.
         """
         site_id = task.site_id
         task_db = self._task_dbs[site_id]
@@ -418,7 +508,7 @@ class TaskQueue(object):
         the number of seconds since UNIX epoch.  The default value for the
         `seconds` argument is 0, meaning right now.
         """
-        return str(int(time.time()) + seconds).zfill(self._key_length)
+        return str(int(_now()) + seconds).zfill(self._key_length)
 
     @staticmethod
     def _estimate_revisit_wait(task):
@@ -25,63 +25,161 @@ import logging
 import urlparse
 
 
+# Cache of parsed URLs.  URL instances are immutable, so the attributes
+# computed for a string can be shared by all the instances created from it.
+# The cache is cleared when it reaches its maximum size.
+_parse_cache = {}
+
+_MAX_CACHE_SIZE = 4096
+
+# Shared instances of the schemes and hostnames, see `_intern()`.  It is
+# cleared together with the cache of parsed URLs.
+_interned = {}
+
+
+def _intern(value):
+    """Return a shared instance of an unicode string.
+
+    The built-in `intern()` only accepts byte strings.  A crawler creates
+    URLs for a small number of sites, so the same few schemes and hostnames
+    are kept by all the parsed URLs.
+    """
+    return _interned.setdefault(value, value)
+
+
+def _parse_url(url):
+    """Parse an unicode URL.
+
+    Return a tuple with the scheme, username, password, hostname, port, path,
+    normalized URL, basename and dirname.
+    """
+    splitted_url = urlparse.urlsplit(url)
+    root_url = u'%s://%s/' % (splitted_url.scheme, splitted_url.netloc)
+    return ((_intern(splitted_url.scheme), splitted_url.username,
+             splitted_url.password, _intern(splitted_url.hostname),
+             splitted_url.port)
+            + _parse_path(root_url, url[len(root_url):]))
+
+
+def _parse_path(root_url, path):
+    """Parse the path of an unicode URL.
+
+    The `root_url` argument is the normalized URL of the root directory and
+    `path` the rest of the URL.  Return a tuple with the path, normalized URL,
+    basename and dirname.
+    """
+    path = path.rstrip(u'/')
+    if not path:
+        return (u'/', root_url, u'/', u'/')
+    normalized_url = u'%s%s' % (root_url, path.lstrip(u'/'))
+    path = u'/%s' % path.lstrip(u'/')
+    dirname, _, basename = path.rpartition(u'/')
+    if not dirname:
+        dirname = u'/'
+    return (path, normalized_url, basename, dirname)
+
+
 class URL(object):
     """Uniform Resource Locator.
     """
 
+    __slots__ = ('_is_root', '_scheme', '_username', '_password', '_hostname',
+                 '_port', '_path', '_url', '_basename', '_dirname', '_str')
+
+    # Encodings tried when decoding byte strings.
+    _encodings = ('utf-8', 'cp1252')
+
     def __init__(self, url, is_root=False):
         """Initialize the URL.
 
         Initialize the URL from the string `url`.
         """
         self._is_root = is_root
-        self._encodings = ('utf-8', 'cp1252')
+        # The cache is indexed by the decoded URL, so byte and unicode strings
+        # for the same URL share the entry.
         url = self._decode_str(url)
-        splitted_url = urlparse.urlsplit(url)
-        root_url = u'%s://%s/' % (splitted_url.scheme, splitted_url.netloc)
-        self._scheme = splitted_url.scheme
-        self._username = splitted_url.username
-        self._password = splitted_url.password
-        self._hostname = splitted_url.hostname
-        self._port = splitted_url.port
-        path = url[len(root_url):].rstrip(u'/')
-        if not path:
-            self._path = u'/'
-            self._url = root_url
-            self._basename = u'/'
-            self._dirname = u'/'
-        else:
-            self._path = u'/%s' % path.lstrip(u'/')
-            self._url = u'%s%s' % (root_url, path.lstrip(u'/'))
-            self._basename = self._path[self._path.rindex(u'/') + 1:]
-            self._dirname = self._path[:- len(self._basename) - 1]
-            if not self._dirname:
-                self._dirname = u'/'
+        try:
+            parsed_url = _parse_cache[url]
+        except KeyError:
+            parsed_url = self._cache_parsed(url, _parse_url(url))
+        (self._scheme, self._username, self._password, self._hostname,
+         self._port, self._path, self._url, self._basename,
+         self._dirname, self._str) = parsed_url
 
     def __str__(self):
         """Return the URL as string.
         """
-        return self._url.encode(self._encodings[0])
+        return self._str
+
+    def __eq__(self, other):
+        """Compare the normalized URLs.
+        """
+        if not isinstance(other, URL):
+            return NotImplemented
+        return self._url == other._url
+
+    def __ne__(self, other):
+        """Compare the normalized URLs.
+        """
+        if not isinstance(other, URL):
+            return NotImplemented
+        return self._url != other._url
+
+    def __hash__(self):
+        """Return the hash of the normalized URL.
+        """
+        return hash(self._url)
 
     def __getstate__(self):
         """Used by pickle when instances are serialized.
+
+        The parsed attributes are included in the state, so the URL is not
+        parsed again when it is unserialized.
         """
-        return {
-            'url': self._url.encode(self._encodings[0]),
-            'is_root': self._is_root,
-        }
+        return (self._is_root, self._scheme, self._username, self._password,
+                self._hostname, self._port, self._path, self._url,
+                self._basename, self._dirname)
 
     def __setstate__(self, state):
         """Used by pickle when instances are unserialized.
         """
-        self.__init__(state['url'], state['is_root'])
+        if isinstance(state, dict):
+            # URL pickled by a previous version, still in a queue.
+            self.__init__(state['url'], state['is_root'])
+        else:
+            (self._is_root, self._scheme, self._username, self._password,
+             self._hostname, self._port, self._path, self._url,
+             self._basename, self._dirname) = state
+            self._str = self._url.encode(self._encodings[0])
 
     def join(self, path):
         """Join a path to the URL and return the new URL.
         """
         path = self._decode_str(path)
         base_url = self._url[:-1] if self._path == u'/' else self._url
-        return URL(u'%s/%s' % (base_url, path.lstrip(u'/')))
+        url = u'%s/%s' % (base_url, path.lstrip(u'/'))
+        if url not in _parse_cache:
+            # The new URL has the same scheme and network location, only the
+            # path should be parsed.
+            root_url = self._url[:len(self._url) - len(self._path) + 1]
+            self._cache_parsed(url, (self._scheme, self._username,
+                                     self._password, self._hostname,
+                                     self._port)
+                               + _parse_path(root_url, url[len(root_url):]))
+        return URL(url)
+
+    def _cache_parsed(self, url, parsed_url):
+        """Add a parsed URL to the cache.
+
+        The tuple returned by `_parse_url()` is extended with the encoded URL
+        returned by `__str__()`, added to the cache and returned.
+        """
+        parsed_url += (parsed_url[6].encode(self._encodings[0]),)
+        if len(_parse_cache) >= _MAX_CACHE_SIZE:
+            _parse_cache.clear()
+            _interned.clear()
+        _parse_cache[url] = parsed_url
+        return parsed_url
 
     def _decode_str(self, byte_str):
         """Return an unicode object for the given string.
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""Common setup for the test modules.
+
+It is loaded by pytest before collecting the tests and imported by each test
+module, so the tests can also be run as standalone scripts.
+"""
+
+import os
+import sys
+import errno
+import atexit
+import shutil
+import tempfile
+import unittest
+
+TESTDIR = os.path.dirname(os.path.abspath(__file__))
+SRCDIR = os.path.abspath(os.path.join(TESTDIR, os.path.pardir))
+if SRCDIR not in sys.path:
+    sys.path.insert(0, SRCDIR)
+
+# Directory where the tests create their databases.  It is a temporary
+# directory, removed at exit, created inside the directory given in the
+# ARACHNE_TEST_DBDIR environment variable.  Otherwise a memory backed file
+# system is used if available because writing to disk is not what is tested.
+_dbdir_parent = os.environ.get('ARACHNE_TEST_DBDIR')
+if not _dbdir_parent:
+    if os.path.isdir('/dev/shm'):
+        _dbdir_parent = '/dev/shm'
+    else:
+        _dbdir_parent = TESTDIR
+elif not os.path.isdir(_dbdir_parent):
+    os.makedirs(_dbdir_parent)
+DBDIR = tempfile.mkdtemp(prefix='arachne-tests-', dir=_dbdir_parent)
+atexit.register(shutil.rmtree, DBDIR, ignore_errors=True)
+
+
+def rmtree(dirname):
+    """Remove a directory created by a test.
+
+    Unlike `shutil.rmtree()` the type of the entries is not checked before
+    removing them.  Each entry is unlinked and only if that fails because
+    it is a directory it is removed as a directory.
+    """
+    for filename in os.listdir(dirname):
+        path = os.path.join(dirname, filename)
+        try:
+            os.unlink(path)
+        except OSError, e:
+            # Linux fails with EISDIR for directories, other systems with
+            # EPERM.
+            if e.errno not in (errno.EISDIR, errno.EPERM):
+                raise
+            rmtree(path)
+    os.rmdir(dirname)
+
+
+def add_tests(test_case, name, check, cases):
+    """Add a test method to `test_case` for each case in `cases`.
+
+    Each test calls `check` with the test case instance and the items of a
+    case, so each case is run and reported as an independent test.  The
+    tests are named after `name` and the index of the case.
+    """
+    def make_test(case):
+        def test(self):
+            check(self, *case)
+        return test
+    for i, case in enumerate(cases):
+        setattr(test_case, 'test_%s_%02d' % (name, i), make_test(case))
+
+
+# Values, default and help of the verbosity option of the test scripts.
+_VERBOSITY_CHOICES = (0, 1, 2)
+
+_VERBOSITY_DEFAULT = 2
+
+_VERBOSITY_HELP = 'verbosity level: 0 = minimal, 1 = normal, 2 = all'
+
+# Command line parser, created the first time it is needed.
+_parser = None
+
+
+def _get_parser():
+    """Return the command line parser of the test scripts.
+    """
+    global _parser
+    if _parser is None:
+        import argparse
+        _parser = argparse.ArgumentParser()
+        _parser.add_argument('-v', dest='verbosity', type=int,
+                             default=_VERBOSITY_DEFAULT,
+                             choices=_VERBOSITY_CHOICES,
+                             help=_VERBOSITY_HELP)
+    return _parser
+
+
+def run_module(name):
+    """Run the tests of a module from the command line.
+
+    The `name` argument should be the `__name__` of the test module.  The
+    tests are loaded from the module object, so it is not imported again by
+    name.  The command line is only parsed (and argparse imported) if there
+    are options.
+    """
+    verbosity = _VERBOSITY_DEFAULT
+    if sys.argv[1:]:
+        verbosity = _get_parser().parse_args().verbosity
+    suite = unittest.TestLoader().loadTestsFromModule(sys.modules[name])
+    runner = unittest.TextTestRunner(verbosity=verbosity)
+    result = runner.run(suite)
+    sys.exit(not result.wasSuccessful())
@@ -2,26 +2,55 @@
 
 import os
 import sys
-import optparse
+import argparse
 import unittest
+import subprocess
+from multiprocessing.pool import ThreadPool
 
-TESTDIR = os.path.dirname(os.path.abspath(__file__))
-SRCDIR = os.path.abspath(os.path.join(TESTDIR, os.path.pardir))
-sys.path.insert(0, SRCDIR)
+from conftest import TESTDIR, _get_parser
+
+
+def _run_script(args):
+    """Run a test module as a script and return its status and output.
+    """
+    process = subprocess.Popen(args, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT)
+    output = process.communicate()[0]
+    return process.returncode, output
+
+
+def _run_parallel(names, verbosity, jobs):
+    """Run each test module in its own process, `jobs` at a time.
+
+    The modules create their databases in different directories, so they
+    can run at the same time.  The output of each module is written when it
+    finishes.
+    """
+    commands = [[sys.executable, os.path.join(TESTDIR, name + '.py'),
+                 '-v', str(verbosity)] for name in names]
+    pool = ThreadPool(jobs)
+    failed = False
+    for returncode, output in pool.imap_unordered(_run_script, commands):
+        sys.stdout.write(output)
+        failed = failed or returncode != 0
+    pool.close()
+    pool.join()
+    return failed
 
 
 def main():
-    parser = optparse.OptionParser()
-    parser.add_option('-v', dest='verbosity', default='2',
-                      type='choice', choices=['0', '1', '2'],
-                      help='verbosity level: 0 = minimal, 1 = normal, 2 = all')
-    options = parser.parse_args()[0]
-    sys.path.append(TESTDIR)
+    # The options of the test scripts are inherited, including -h.
+    parser = argparse.ArgumentParser(parents=[_get_parser()], add_help=False)
+    parser.add_argument('-j', dest='jobs', default=1, type=int,
+                        help='number of test modules run in parallel')
+    options = parser.parse_args()
     names = [filename[:-3] for filename in os.listdir(TESTDIR)
              if (filename.startswith('test') and filename.endswith('.py')
                  and filename != os.path.basename(__file__))]
+    if options.jobs > 1:
+        sys.exit(_run_parallel(names, options.verbosity, options.jobs))
     suite = unittest.TestLoader().loadTestsFromNames(names)
-    runner = unittest.TextTestRunner(verbosity=int(options.verbosity))
+    runner = unittest.TextTestRunner(verbosity=options.verbosity)
     result = runner.run(suite)
     sys.exit(not result.wasSuccessful())
 
@@ -1,77 +1,66 @@
 # -*- coding: utf-8 -*-
 
-import os
-import sys
-import shutil
-import optparse
 import unittest
+from collections import Counter
 
-TESTDIR = os.path.dirname(os.path.abspath(__file__))
-SRCDIR = os.path.abspath(os.path.join(TESTDIR, os.path.pardir))
-sys.path.insert(0, SRCDIR)
+from conftest import add_tests, run_module
 
 from arachne.processor import IndexProcessor
 
 
 class TestIndexProcessor(unittest.TestCase):
 
-    def test_get_terms(self):
-        test_data = (
-            (u'Arachne',
-             [u'arachne']),
+    _TEST_DATA = (
+        (u'Arachne',
+         [u'arachne']),
 
-            (u'arachne1.0',
-             [u'arachne', u'1.0']),
+        (u'arachne1.0',
+         [u'arachne', u'1.0']),
 
-            (u'Yasser González Fernández',
-             [u'yasser', u'gonzález', u'gonzalez', u'fernández', u'fernandez']),
+        (u'Yasser González Fernández',
+         [u'yasser', u'gonzález', u'gonzalez', u'fernández', u'fernandez']),
 
-            (u'Python-3.0rc1.tar.bz2',
-             [u'python', u'3.0', u'1', u'tar', u'2']),
+        (u'Python-3.0rc1.tar.bz2',
+         [u'python', u'3.0', u'1', u'tar', u'2']),
 
-            (u'07. (Let me be your) Teddy bear.mp3',
-             [u'let', u'your', u'teddy', u'bear', u'3']),
+        (u'07. (Let me be your) Teddy bear.mp3',
+         [u'let', u'your', u'teddy', u'bear', u'3']),
 
-            (u'dive_into_python.zip',
-             [u'dive', u'into', u'python', u'zip']),
+        (u'dive_into_python.zip',
+         [u'dive', u'into', u'python', u'zip']),
 
-            (u'AFewCamelCasedWords',
-             [u'afewcamelcasedwords', u'few', u'camel', u'cased', u'words']),
+        (u'AFewCamelCasedWords',
+         [u'afewcamelcasedwords', u'few', u'camel', u'cased', u'words']),
 
-            (u'It should ignore this: ! # &.',
-             [u'should', u'ignore', u'this']),
+        (u'It should ignore this: ! # &.',
+         [u'should', u'ignore', u'this']),
 
-            (u'Please, please me',
-             [u'please']),
+        (u'Please, please me',
+         [u'please']),
 
-            (u'/Books/Programming/Python/dive_into_python',
-             [u'books', u'programming', u'python', u'dive', u'into']),
+        (u'/Books/Programming/Python/dive_into_python',
+         [u'books', u'programming', u'python', u'dive', u'into']),
 
-            (u'/Music/The Beatles/Meet The Beatles!',
-             [u'music', u'the', u'beatles', u'meet']),
+        (u'/Music/The Beatles/Meet The Beatles!',
+         [u'music', u'the', u'beatles', u'meet']),
 
-            (u'The C Programming Language',
-             [u'the', u'c', u'programming', u'language']),
-        )
-        for basename, right_terms in test_data:
-            terms = IndexProcessor.get_terms(basename)
-            for term in terms:
-                self.assertTrue(term in right_terms, term)
-                right_terms.remove(term)
-            self.assertEquals(len(right_terms), 0)
+        (u'The C Programming Language',
+         [u'the', u'c', u'programming', u'language']),
+    )
+
+
+def _check_get_terms(self, basename, right_terms):
+    # Check the terms extracted from a path, run as a test for each case.
+    terms = IndexProcessor.get_terms(basename)
+    self.assertEqual(Counter(terms), Counter(right_terms), basename)
+
+
+add_tests(TestIndexProcessor, 'get_terms', _check_get_terms,
+          TestIndexProcessor._TEST_DATA)
 
 
 def main():
-    parser = optparse.OptionParser()
-    parser.add_option('-v', dest='verbosity', default='2',
-                      type='choice', choices=['0', '1', '2'],
-                      help='verbosity level: 0 = minimal, 1 = normal, 2 = all')
-    options = parser.parse_args()[0]
-    module = os.path.basename(__file__)[:-3]
-    suite = unittest.TestLoader().loadTestsFromName(module)
-    runner = unittest.TextTestRunner(verbosity=int(options.verbosity))
-    result = runner.run(suite)
-    sys.exit(not result.wasSuccessful())
+    run_module(__name__)
 
 
 if __name__ == '__main__':
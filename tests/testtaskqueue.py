@@ -1,17 +1,13 @@
 # -*- coding: utf-8 -*-
 
-import os
-import sys
 import time
-import shutil
-import optparse
+import tempfile
 import unittest
 import itertools
 
-TESTDIR = os.path.dirname(os.path.abspath(__file__))
-SRCDIR = os.path.abspath(os.path.join(TESTDIR, os.path.pardir))
-sys.path.insert(0, SRCDIR)
+from conftest import DBDIR, rmtree, run_module
 
+import arachne.task
 from arachne.error import EmptyQueue
 from arachne.task import CrawlTask, TaskQueue
 from arachne.url import URL
@@ -19,15 +15,16 @@ from arachne.url import URL
 
 class TestTaskQueue(unittest.TestCase):
 
-    def setUp(self):
-        self._db_home = os.path.join(TESTDIR, 'testtaskqueue')
-        os.mkdir(self._db_home)
-        self._request_wait = 2
-        self._error_dir_wait = 3
-        self._error_site_wait = 4
-        self._min_revisit_wait = 2
-        self._default_revisit_wait = 4
-        self._sites_info = {
+    _db_homes = []
+
+    @classmethod
+    def setUpClass(cls):
+        cls._request_wait = 2
+        cls._error_dir_wait = 3
+        cls._error_site_wait = 4
+        cls._min_revisit_wait = 2
+        cls._default_revisit_wait = 4
+        cls._sites_info_template = {
             'a78e6853355ad5cdc751ad678d15339382f9ed21':
                 {'url': URL('ftp://atlantis.uh.cu/')},
             '7e019d6f671d336a0cc31f137ba034efb13fc327':
@@ -49,104 +46,139 @@ class TestTaskQueue(unittest.TestCase):
             'c5bcce5953866b673054f8927648d634a7237a9b':
                 {'url': URL('ftp://bristol.reduh.uh.cu/')},
         }
-        self._tasks = {}
-        self._tasks_per_site = 10
-        self._num_sites = len(self._sites_info)
-        self._num_tasks = self._num_sites * self._tasks_per_site
-        for site_id, info in self._sites_info.iteritems():
+        cls._tasks_template = {}
+        dir_names = tuple(str(n) for n in xrange(10))
+        cls._tasks_per_site = len(dir_names)
+        cls._num_sites = len(cls._sites_info_template)
+        cls._num_tasks = cls._num_sites * cls._tasks_per_site
+        for site_id, info in cls._sites_info_template.iteritems():
             # Set common information.
             info['max_depth'] = 100
-            info['request_wait'] = self._request_wait
-            info['error_dir_wait'] = self._error_dir_wait
-            info['error_site_wait'] = self._error_site_wait
-            info['min_revisit_wait'] = self._min_revisit_wait
-            info['default_revisit_wait'] = self._default_revisit_wait
+            info['request_wait'] = cls._request_wait
+            info['error_dir_wait'] = cls._error_dir_wait
+            info['error_site_wait'] = cls._error_site_wait
+            info['min_revisit_wait'] = cls._min_revisit_wait
+            info['default_revisit_wait'] = cls._default_revisit_wait
             # Create tasks for site.
-            task_list = []
-            for name in (str(n) for n in xrange(self._tasks_per_site)):
-                task_list.append(CrawlTask(site_id, info['url'].join(name)))
-            self._tasks[site_id] = task_list
+            cls._tasks_template[site_id] = tuple(
+                CrawlTask(site_id, info['url'].join(name))
+                for name in dir_names)
+        # All the tasks of the sites in a single sequence.
+        cls._flat_tasks = tuple(
+            itertools.chain.from_iterable(cls._tasks_template.itervalues()))
+
+    def setUp(self):
+        # The queue uses a virtual clock advanced by _sleep().  The real clock
+        # is restored even if the rest of setUp() fails.
+        self._now = time.time()
+        self.addCleanup(setattr, arachne.task, '_now', arachne.task._now)
+        arachne.task._now = lambda: self._now
+        self._db_home = tempfile.mkdtemp(prefix='testtaskqueue-', dir=DBDIR)
+        # The tests can remove sites and tasks, but the tasks and the
+        # information of each site are not modified.
+        self._sites_info = dict(self._sites_info_template)
+        self._tasks = dict((site_id, list(tasks)) for site_id, tasks
+                           in self._tasks_template.iteritems())
         self._queue = TaskQueue(self._sites_info, self._db_home)
 
     def test_length(self):
         # It should contain tasks for the root directories.
-        self.assertEquals(len(self._queue), self._num_sites)
-        for i, task in enumerate(itertools.chain(*self._tasks.itervalues())):
+        self.assertEqual(len(self._queue), self._num_sites)
+        for i, task in enumerate(self._flat_tasks):
             self._queue.put_new(task)
-            self.assertEquals(len(self._queue), self._num_sites + i + 1)
+            self.assertEqual(len(self._queue), self._num_sites + i + 1)
         for i in xrange(self._num_tasks):
             if i % self._num_sites == 0 and i != 0:
-                time.sleep(self._request_wait)
+                self._sleep(self._request_wait)
             task = self._queue.get()
             self._queue.report_done(task)
-            self.assertEquals(len(self._queue),
-                              self._num_sites + self._num_tasks - i - 1)
+            self.assertEqual(len(self._queue),
+                             self._num_sites + self._num_tasks - i - 1)
         # Remove the tasks for the root directories.
-        time.sleep(self._request_wait)
+        self._sleep(self._request_wait)
         for i in xrange(self._num_sites):
             self._queue.report_done(self._queue.get())
-            self.assertEquals(len(self._queue), self._num_sites - i - 1)
+            self.assertEqual(len(self._queue), self._num_sites - i - 1)
 
     def test_populate(self):
         # Remove the tasks for the root directories.
         for i in xrange(self._num_sites):
             self._queue.report_done(self._queue.get())
-        time.sleep(self._request_wait)
+        self._sleep(self._request_wait)
         self.assertRaises(EmptyQueue, self._queue.get)
         # Insert tasks in the queue.
-        for task in itertools.chain(*self._tasks.values()):
-            self._queue.put_new(task)
+        self._queue.put_new_many(self._flat_tasks)
         # Remove tasks for the queue.
         i = 0
         while i < self._num_tasks:
             if i % self._num_sites == 0:
-                time.sleep(self._request_wait)
+                self._sleep(self._request_wait)
             returned = self._queue.get()
             task_list = self._tasks[returned.site_id]
-            self.assertEquals(str(returned.url), str(task_list[0].url))
+            self.assertEqual(returned.url, task_list[0].url)
             del task_list[0]
             self._queue.report_done(returned)
             i += 1
         for task_list in self._tasks.itervalues():
             # The lists of tasks should be empty.
-            self.assertEquals(len(task_list), 0)
+            self.assertEqual(len(task_list), 0)
 
     def test_persistence(self):
-        for task in itertools.chain(*self._tasks.values()):
-            self._queue.put_new(task)
+        self._queue.put_new_many(self._flat_tasks)
+        # Close the queue to write all the tasks to disk and open it again.
+        self._queue.close()
+        self._queue = TaskQueue(self._sites_info, self._db_home)
+        total = self._num_sites + self._num_tasks
+        done_urls = set()
         i = 0
         while self._queue:
-            if i % (self._tasks_per_site / 2) == 0:
-                # When a few tasks have been removed close the database to
-                # write all the tasks to disk and open it again.
+            if i == total / 2:
+                # Close the queue when half of the tasks have been reported
+                # done and open it again, the tasks should not be returned.
                 self._queue.close()
                 self._queue = TaskQueue(self._sites_info, self._db_home)
             if i % (self._num_sites - 1) == 0:
-                time.sleep(self._request_wait)
+                self._sleep(self._request_wait)
             returned = self._queue.get()
+            self.assertFalse(returned.url in done_urls)
             self._queue.report_done(returned)
+            done_urls.add(returned.url)
             i += 1
         # Check that all tasks were returned.
-        self.assertEquals(i, self._num_sites + self._num_tasks)
+        self.assertEqual(i, total)
+
+    def test_reopen(self):
+        self._queue.put_new_many(self._flat_tasks)
+        i = 0
+        while self._queue:
+            if i % (self._tasks_per_site / 2) == 0:
+                # When a few tasks have been removed reopen the databases.
+                self._queue.reopen()
+            if i % (self._num_sites - 1) == 0:
+                self._sleep(self._request_wait)
+            returned = self._queue.get()
+            self._queue.report_done(returned)
+            i += 1
+        # Check that all tasks were returned.
+        self.assertEqual(i, self._num_sites + self._num_tasks)
 
     def test_remove_site(self):
-        for task in itertools.chain(*self._tasks.values()):
-            self._queue.put_new(task)
+        self._queue.put_new_many(self._flat_tasks)
         self._queue.close()
         # It should not return tasks from the removed site.
-        del self._sites_info[self._sites_info.keys()[0]]
+        del self._sites_info[next(iter(self._sites_info))]
         self._queue = TaskQueue(self._sites_info, self._db_home)
         i = 0
         while self._queue:
             if i % (self._num_sites - 1) == 0:
-                time.sleep(self._request_wait)
+                self._sleep(self._request_wait)
             returned = self._queue.get()
             self.assertTrue(returned.site_id in self._sites_info)
             self._queue.report_done(returned)
             i += 1
         # Check that all tasks were returned.
-        self.assertEquals(i + self._tasks_per_site + 1,
-                          self._num_sites + self._num_tasks)
+        self.assertEqual(i + self._tasks_per_site + 1,
+                         self._num_sites + self._num_tasks)
 
     def test_put_visited(self):
         self._clear_queue(remain=1)
@@ -154,12 +186,12 @@ class TestTaskQueue(unittest.TestCase):
         self._queue.report_done(task)
         self._queue.put_visited(task, True)
         self.assertRaises(EmptyQueue, self._queue.get)
-        time.sleep(self._default_revisit_wait)
+        self._sleep(self._default_revisit_wait)
         task = self._queue.get()
         self._queue.report_done(task)
         self._queue.put_visited(task, True)
         self.assertRaises(EmptyQueue, self._queue.get)
-        time.sleep(self._default_revisit_wait)
+        self._sleep(self._default_revisit_wait)
         task = self._queue.get()
 
     def test_report_done(self):
@@ -169,51 +201,56 @@ class TestTaskQueue(unittest.TestCase):
         self._queue.put_new(task)
         self._queue.report_done(task)
         self.assertRaises(EmptyQueue, self._queue.get)
-        time.sleep(self._request_wait)
-        self.assertEquals(str(task.url), str(self._queue.get().url))
+        self._sleep(self._request_wait)
+        self.assertEqual(task.url, self._queue.get().url)
 
     def test_report_error_site(self):
         self._clear_queue(remain=1)
         task = self._queue.get()
         self._queue.report_error_site(task)
         self.assertRaises(EmptyQueue, self._queue.get)
-        time.sleep(self._error_site_wait)
-        self.assertEquals(str(task.url), str(self._queue.get().url))
+        self._sleep(self._error_site_wait)
+        self.assertEqual(task.url, self._queue.get().url)
 
     def test_report_error_dir(self):
         self._clear_queue(remain=1)
         task = self._queue.get()
         self._queue.report_error_dir(task)
         self.assertRaises(EmptyQueue, self._queue.get)
-        time.sleep(self._error_dir_wait)
-        self.assertEquals(str(task.url), str(self._queue.get().url))
+        self._sleep(self._error_dir_wait)
+        self.assertEqual(task.url, self._queue.get().url)
 
     def _clear_queue(self, remain=0):
         # Remove tasks from the queue until the specified number of tasks
         # (default 0) remains in the queue.
-        for i in xrange(len(self._queue) - remain):
-            if i != 0 and i % self._num_sites == 0:
-                time.sleep(self._request_wait)
-            self._queue.report_done(self._queue.get())
-        self.assertEquals(len(self._queue), remain)
+        pending = len(self._queue) - remain
+        pending -= len(self._queue.remove_many(pending))
+        while pending:
+            # Wait until the sites can be visited again.
+            self._sleep(self._request_wait)
+            drained = self._queue.remove_many(pending)
+            self.assertTrue(drained)
+            pending -= len(drained)
+        self.assertEqual(len(self._queue), remain)
+
+    def _sleep(self, seconds):
+        # Advance the clock of the queue instead of waiting.
+        self._now += seconds
 
     def tearDown(self):
-        if os.path.isdir(self._db_home):
-            self._queue.close()
-            shutil.rmtree(self._db_home)
+        self._queue.close()
+        # The database directories are removed together after all the tests.
+        self._db_homes.append(self._db_home)
+
+    @classmethod
+    def tearDownClass(cls):
+        for db_home in cls._db_homes:
+            rmtree(db_home)
+        del cls._db_homes[:]
 
 
 def main():
-    parser = optparse.OptionParser()
-    parser.add_option('-v', dest='verbosity', default='2',
-                      type='choice', choices=['0', '1', '2'],
-                      help='verbosity level: 0 = minimal, 1 = normal, 2 = all')
-    options = parser.parse_args()[0]
-    module = os.path.basename(__file__)[:-3]
-    suite = unittest.TestLoader().loadTestsFromName(module)
-    runner = unittest.TextTestRunner(verbosity=int(options.verbosity))
-    result = runner.run(suite)
-    sys.exit(not result.wasSuccessful())
+    run_module(__name__)
 
 
 if __name__ == '__main__':